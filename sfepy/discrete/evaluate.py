@@ -17,10 +17,16 @@ def apply_ebc_to_matrix(mtx, ebc_rows, epbc_rows=None):
     """
     data, prows, cols = mtx.data, mtx.indptr, mtx.indices
     # Does not change the sparsity pattern.
-    for ir in ebc_rows:
-        for ic in range(prows[ir], prows[ir + 1]):
-            if (cols[ic] == ir):
-                data[ic] = 1.0
+    ebc_rows = nm.asarray(ebc_rows, dtype=prows.dtype)
+    if len(ebc_rows):
+        # Indices of all entries in EBC rows.
+        starts = prows[ebc_rows]
+        counts = prows[ebc_rows + 1] - starts
+        offsets = nm.cumsum(counts) - counts
+        ics = nm.repeat(starts - offsets, counts) + nm.arange(counts.sum())
+        irs = nm.repeat(ebc_rows, counts)
+
+        data[ics[cols[ics] == irs]] = 1.0
 
     if epbc_rows is not None:
         import warnings
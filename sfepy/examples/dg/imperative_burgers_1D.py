@@ -11,7 +11,6 @@ import numpy as nm
 
 from sfepy.examples.dg.example_dg_common import \
     clear_folder, get_gen_1D_mesh_hook
-from sfepy.examples.dg.dg_plot_1D import load_and_plot_fun
 
 # sfepy imports
 from sfepy.base.base import IndexedStruct
@@ -231,6 +230,8 @@ def main(argv=None):
     # | Plot 1D|
     # ----------
     if options.plot:
+        from sfepy.examples.dg.dg_plot_1D import load_and_plot_fun
+
         load_and_plot_fun(output_folder, domain_name,
                           t0, t1, min(tn, save_timestn),
                           ic_fun)
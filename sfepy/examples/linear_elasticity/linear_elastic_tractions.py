@@ -34,6 +34,12 @@ surface. Try running the example with different approximation orders and/or unif
 - use the tri-quadratic approximation (Q2)::
 
     sfepy-run sfepy/examples/linear_elasticity/linear_elastic_tractions.py -O refinement_level=0 -d approx_order=2
+
+- use the PETSc conjugate gradient solver with the algebraic multigrid
+  preconditioner instead of the direct solver (pays off for large meshes,
+  requires petsc4py)::
+
+    sfepy-run sfepy/examples/linear_elasticity/linear_elastic_tractions.py -O refinement_level=2 -d approx_order=1,ls_name=lsi
 """
 from __future__ import absolute_import
 import numpy as nm
@@ -98,15 +104,24 @@ def verify_tractions(out, problem, state, extend=False):
 
     return out
 
-def define(approx_order=1):
-    """Define the problem to solve."""
+def define(approx_order=1, ls_name='ls'):
+    """
+    Define the problem to solve.
+
+    Parameters
+    ----------
+    approx_order : int
+        The displacement field approximation order.
+    ls_name : str
+        The linear system solver name: 'ls' (direct) or 'lsi' (iterative).
+    """
     from sfepy import data_dir
 
     filename_mesh = data_dir + '/meshes/3d/block.mesh'
 
     options = {
         'nls' : 'newton',
-        'ls' : 'ls',
+        'ls' : ls_name,
         'post_process_hook' : 'verify_tractions',
     }
 
@@ -160,6 +175,13 @@ def define(approx_order=1):
     # Solvers etc.
     solvers = {
         'ls' : ('ls.auto_direct', {}),
+        'lsi' : ('ls.petsc', {
+            'method' : 'cg',
+            'precond' : 'gamg',
+            'i_max' : 1000,
+            'eps_a' : 1e-12,
+            'eps_r' : 1e-8,
+        }),
         'newton' : ('nls.newton',
                     { 'i_max'      : 1,
                       'eps_a'      : 1e-10,
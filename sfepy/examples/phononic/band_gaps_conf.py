@@ -111,6 +111,14 @@ class BandGapsConf(Struct):
                 'i_max'      : 1000,
                 'eps_a'      : 1e-12,
             }),
+            # Set options['ls'] = 'ls_p' to use for large meshes.
+            'ls_p' : ('ls.petsc', {
+                'method' : 'cg',
+                'precond' : 'gamg',
+                'i_max' : 1000,
+                'eps_a' : 1e-12,
+                'eps_r' : 1e-8,
+            }),
             'newton' : ('nls.newton', {
                 'i_max' : 1,
                 'eps_a' : 1e-4,
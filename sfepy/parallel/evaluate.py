@@ -29,6 +29,9 @@ class PETScParallelEvaluator(Evaluator):
         self.gather, self.scatter = pp.create_gather_scatter(pdofs, self.psol_i,
                                                              psol, comm=comm)
 
+        # The DOF numbering does not change between iterations.
+        self.lgmap = pp.create_petsc_lgmap(pdofs, comm=comm)
+
     def eval_residual(self, snes, psol, prhs):
         self.scatter(self.psol_i, psol)
 
@@ -46,4 +49,5 @@ class PETScParallelEvaluator(Evaluator):
                                                is_full=True)
         pp.assemble_mtx_to_petsc(pmtx, mtx_if, self.pdofs, self.drange,
                                  self.is_overlap,
-                                 self.comm, verbose=self.verbose)
+                                 self.comm, lgmap=self.lgmap,
+                                 verbose=self.verbose)
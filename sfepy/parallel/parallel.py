@@ -1,11 +1,9 @@
 """
 Functions for a high-level PETSc-based parallelization.
 """
-from __future__ import absolute_import
 import os
 
 import numpy as nm
-from six.moves import range
 
 def init_petsc_args():
     try:
@@ -24,8 +22,8 @@ from mpi4py import MPI
 
 from sfepy.base.base import assert_, output, ordered_iteritems, Struct
 from sfepy.base.timing import Timer
+from sfepy.linalg import argsort_rows
 from sfepy.discrete.common.region import Region
-from sfepy.discrete.fem.fe_surface import FESurface
 
 def partition_mesh(mesh, n_parts, use_metis=True, verbose=False):
     """
@@ -80,32 +78,30 @@ def get_inter_facets(domain, cell_tasks):
     # Facet tasks by cells in cfc.
     ftasks = cell_tasks[cfc.indices]
 
-    # Mesh inner and surface facets.
-    if_surf = cmesh.get_surface_facets()
-    if_inner = nm.setdiff1d(nm.arange(cfc.num, dtype=nm.uint32), if_surf)
+    # Mesh inner facets are in two cells, surface facets in one.
+    is_inner = nm.diff(cfc.offsets) == 2
+    if_inner = nm.flatnonzero(is_inner).astype(nm.uint32)
+    offs = cfc.offsets[:-1][is_inner]
 
     # Facets in two tasks = inter-task region facets.
-    if_inter = if_inner[nm.where(ftasks[cfc.offsets[if_inner]]
-                                 != ftasks[cfc.offsets[if_inner] + 1])]
-    aux = nm.c_[cfc.offsets[if_inter], cfc.offsets[if_inter] + 1]
-    inter_tasks = ftasks[aux]
-
-    # Fast version:
-    # from sfepy.linalg import argsort_rows
-    # ii = argsort_rows(inter_tasks)
-    # inter_tasks[ii]
-    # if_inter[ii]
-    inter_facets = {}
-    for ii, (i0, i1) in enumerate(inter_tasks):
-        facet = if_inter[ii]
+    t0, t1 = ftasks[offs], ftasks[offs + 1]
+    is_inter = t0 != t1
+    if_inter = if_inner[is_inter]
+    inter_tasks = nm.c_[t0[is_inter], t1[is_inter]]
+
+    # Group the facets by (unordered) task pairs.
+    inter_tasks = nm.sort(inter_tasks, axis=1)
+    ii = argsort_rows(inter_tasks)
+    inter_tasks = inter_tasks[ii]
+    if_inter = if_inter[ii]
 
-        ntasks = inter_facets.setdefault(i0, {})
-        facets = ntasks.setdefault(i1, [])
-        facets.append(facet)
+    pairs, starts = nm.unique(inter_tasks, axis=0, return_index=True)
+    groups = nm.split(if_inter, starts[1:])
 
-        ntasks = inter_facets.setdefault(i1, {})
-        facets = ntasks.setdefault(i0, [])
-        facets.append(facet)
+    inter_facets = {}
+    for (i0, i1), facets in zip(pairs, groups):
+        inter_facets.setdefault(i0, {})[i1] = facets
+        inter_facets.setdefault(i1, {})[i0] = facets
 
     return inter_facets
 
@@ -141,10 +137,13 @@ def create_task_dof_maps(field, cell_tasks, inter_facets, is_overlap=True,
     cmesh = domain.cmesh
 
     if use_expand_dofs:
-        id_map = nm.zeros(field.n_nod * field.n_components, dtype=nm.uint32)
+        n_dof = field.n_nod * field.n_components
 
     else:
-        id_map = nm.zeros(field.n_nod, dtype=nm.uint32)
+        n_dof = field.n_nod
+
+    # The claimed DOFs marker - the id_map is allocated for the enumeration.
+    marker = nm.zeros(n_dof, dtype=nm.uint8)
 
     def _get_dofs_region(field, region):
         dofs = field.get_dofs_in_region(region)
@@ -152,11 +151,26 @@ def create_task_dof_maps(field, cell_tasks, inter_facets, is_overlap=True,
             dofs = expand_dofs(dofs, field.n_components)
         return dofs
 
-    def _get_dofs_conn(field, conn):
-        dofs = nm.unique(conn)
-        if use_expand_dofs:
-            dofs = expand_dofs(dofs, field.n_components)
-        return dofs
+    def _get_facets_conn(field, facets):
+        # The facet DOFs w.r.t. the first cell containing each facet - only
+        # the DOF sets matter, not their order.
+        tdim = cmesh.tdim
+        cells, offs = cmesh.get_incident(tdim, facets, tdim - 1,
+                                         ret_offsets=True)
+        cells = cells[offs[:-1]]
+        offs = nm.arange(len(facets) + 1, dtype=nm.uint32)
+        lfis = cmesh.get_local_ids(facets, tdim - 1, cells, offs, tdim)
+
+        ii = field.region.get_cell_indices(cells)
+        conn = field.econn[ii[:, None], field.efaces[lfis]]
+        return conn
+
+    # Get the facet DOF connectivity of all interface facets at once.
+    if len(inter_facets):
+        ifacets = nm.unique(nm.concatenate([facets
+                                            for ntasks in inter_facets.values()
+                                            for facets in ntasks.values()]))
+        fconn = _get_facets_conn(field, ifacets)
 
     dof_maps = {}
     count = 0
@@ -172,18 +186,17 @@ def create_task_dof_maps(field, cell_tasks, inter_facets, is_overlap=True,
         dofs = _get_dofs_region(field, cregion)
 
         rdof_map = dof_maps.setdefault(ir, [None, [], [], 0, 0])
-        inter_dofs = []
+        halves = []
+        hconns = []
         for ic, facets in ordered_iteritems(ntasks):
             cdof_map = dof_maps.setdefault(ic, [None, [], [], 0, 0])
 
-            name = 'inter_%d_%d' % (ir, ic)
-            ii = ir
-
-            region = Region.from_facets(facets, domain, name,
-                                        parent=cregion.name)
-            region.update_shape()
-
             if save_inter_regions:
+                name = 'inter_%d_%d' % (ir, ic)
+                region = Region.from_facets(facets, domain, name,
+                                            parent=cregion.name)
+                region.update_shape()
+
                 output_dir = output_dir if output_dir is not None else '.'
                 filename = os.path.join(output_dir, '%s.mesh' % name)
 
@@ -197,70 +210,76 @@ def create_task_dof_maps(field, cell_tasks, inter_facets, is_overlap=True,
                 filename = os.path.join(output_dir, '%s.h5' % name)
                 domain.mesh.write(filename, out=out, io='auto')
 
-            inter_dofs.append(_get_dofs_region(field, region))
+            econn = fconn[nm.searchsorted(ifacets, facets)]
 
-            sd = FESurface('surface_data_%s' % region.name, region,
-                           field.efaces, field.econn, field.region)
-            econn = sd.get_connectivity()
             n_facet = econn.shape[0]
-
             ii2 = max(int(n_facet / 2), 1)
 
-            dr = _get_dofs_conn(field, econn[:ii2])
-            ii = nm.where((id_map[dr] == 0))[0]
-            n_new = len(ii)
-            if n_new:
-                rdof_map[1].append(dr[ii])
-                rdof_map[3] += n_new
-                id_map[dr[ii]] = 1
-                inter_count += n_new
-                count += n_new
-
-                if is_overlap:
-                    ovs = cmesh.get_incident(0, region.facets[:ii2],
-                                             cmesh.tdim - 1)
-                    ocs = cmesh.get_incident(cmesh.tdim, ovs, 0)
-                    rdof_map[2].append(ocs.astype(nm.int32))
-
-            dc = _get_dofs_conn(field, econn[ii2:])
-            ii = nm.where((id_map[dc] == 0))[0]
-            n_new = len(ii)
+            halves.append((rdof_map, facets[:ii2]))
+            hconns.append(econn[:ii2])
+            halves.append((cdof_map, facets[ii2:]))
+            hconns.append(econn[ii2:])
+
+        # Get the unique DOFs of all interface halves by a single unique call
+        # on the (half label, DOF) pairs encoded as integers.
+        n_nod = field.n_nod
+        hlabels = nm.repeat(nm.arange(len(hconns), dtype=nm.int64),
+                            [conn.size for conn in hconns])
+        hconn = nm.concatenate([conn.ravel() for conn in hconns])
+        keys = nm.unique(hlabels * n_nod + hconn)
+        labels = keys // n_nod
+        hdofs = (keys % n_nod).astype(nm.int32)
+        if use_expand_dofs:
+            hdofs = expand_dofs(hdofs, field.n_components)
+            labels = nm.repeat(labels, field.n_components)
+
+        # Claim the new DOFs of all interface halves in a single sweep: a DOF
+        # belongs to the first half it appears in.
+        ii = nm.where(marker[hdofs] == 0)[0]
+        new_dofs, ifirst = nm.unique(hdofs[ii], return_index=True)
+        new_labels = labels[ii[ifirst]]
+        ii = nm.argsort(new_labels, kind='stable')
+        new_dofs = new_dofs[ii]
+        marker[new_dofs] = 1
+
+        n_news = nm.bincount(new_labels, minlength=len(halves))
+        new_dofs = nm.split(new_dofs, nm.cumsum(n_news)[:-1])
+        for (dof_map, hfacets), dnew in zip(halves, new_dofs):
+            n_new = len(dnew)
             if n_new:
-                cdof_map[1].append(dc[ii])
-                cdof_map[3] += n_new
-                id_map[dc[ii]] = 1
+                dof_map[1].append(dnew)
+                dof_map[3] += n_new
                 inter_count += n_new
                 count += n_new
 
                 if is_overlap:
-                    ovs = cmesh.get_incident(0, region.facets[ii2:],
-                                             cmesh.tdim - 1)
+                    ovs = cmesh.get_incident(0, hfacets, cmesh.tdim - 1)
                     ocs = cmesh.get_incident(cmesh.tdim, ovs, 0)
-                    cdof_map[2].append(ocs.astype(nm.int32))
+                    dof_map[2].append(ocs.astype(nm.int32))
 
         domain.regions.pop() # Remove the cell region.
 
-        inner_dofs = nm.setdiff1d(dofs, nm.concatenate(inter_dofs))
+        # All interface DOFs of the task are claimed now.
+        inner_dofs = dofs[marker[dofs] == 0]
         n_inner = len(inner_dofs)
         rdof_map[3] += n_inner
-        assert_(nm.all(id_map[inner_dofs] == 0))
-        id_map[inner_dofs] = 1
+        marker[inner_dofs] = 1
         count += n_inner
 
         rdof_map[0] = inner_dofs
 
+    del marker
+
+    id_map = nm.empty(n_dof, dtype=nm.uint32)
     offset = 0
     overlap_cells = []
     for ir, dof_map in ordered_iteritems(dof_maps):
         n_owned = dof_map[3]
 
-        i0 = len(dof_map[0])
-        id_map[dof_map[0]] = nm.arange(offset, offset + i0, dtype=nm.uint32)
-        for aux in dof_map[1]:
-            i1 = len(aux)
-            id_map[aux] = nm.arange(offset + i0, offset + i0 + i1,
-                                    dtype=nm.uint32)
-            i0 += i1
+        # Number the inner DOFs first, then the owned interface DOFs.
+        iown = nm.concatenate([dof_map[0]] + dof_map[1])
+        i0 = len(iown)
+        id_map[iown] = nm.arange(offset, offset + i0, dtype=nm.uint32)
 
         if len(dof_map[2]):
             ocs = nm.unique(nm.concatenate(dof_map[2]))
@@ -375,57 +394,72 @@ def distribute_field_dofs(field, gfd, use_expand_dofs=False,
         dof_maps = gfd.dof_maps
         id_map = gfd.id_map
 
-        # Send subdomain data to other tasks.
-        for it in range(1, size):
-            # Send owned and overlap cells.
-            cells = nm.union1d(gfd.cell_parts[it], gfd.overlap_cells[it])
-            mpi.send(len(cells), it)
-            mpi.Send([cells, MPI.INTEGER4], it)
-
-            dof_map = dof_maps[it]
+        # Owned and overlap cells of all tasks.
+        cell_parts = [nm.union1d(gfd.cell_parts[it], gfd.overlap_cells[it])
+                      for it in range(size)]
+        n_cells = nm.array([len(cells) for cells in cell_parts],
+                           dtype=nm.int64)
 
-            # Send owned petsc_dofs range.
-            mpi.send(gfd.coffsets[it], it)
-            mpi.send(gfd.coffsets[it] + dof_map[3], it)
-
-            # Send petsc_dofs of global_dofs.
-            global_dofs = field.econn[cells]
+        n_cdof = field.econn.shape[1]
+        if use_expand_dofs:
+            n_cdof *= field.n_components
+
+        # Header: n_cell, owned petsc_dofs range, n_cdof. The
+        # petsc_dofs_conn shape is (n_cell, n_cdof).
+        n_owned = [dof_maps[it][3] for it in range(size)]
+        headers = nm.c_[n_cells, gfd.coffsets, gfd.coffsets + n_owned,
+                        nm.full(size, n_cdof)].astype(nm.int64)
+
+        displs = nm.r_[0, nm.cumsum(n_cells)[:-1]]
+        cells_buf = nm.concatenate(cell_parts).astype(nm.int32)
+
+        # The takes below use mode='clip' only to avoid buffering of out=, so
+        # check the index bounds here.
+        n_el, n_ep = field.econn.shape
+        assert_((len(cells_buf) == 0)
+                or ((cells_buf.min() >= 0) and (cells_buf.max() < n_el)))
+        n_gdof = field.econn.max() + 1
+        if use_expand_dofs:
+            n_gdof *= field.n_components
+        assert_((field.econn.min() >= 0) and (n_gdof <= len(id_map)))
+
+        # petsc_dofs of global_dofs of all tasks, gathered directly into the
+        # send buffer. The PETSc DOFs fit into int32 - use an uint32 view to
+        # match the id_map dtype.
+        conns_buf = nm.empty((n_cells.sum(), n_cdof), dtype=nm.int32)
+        uconns_buf = conns_buf.view(nm.uint32)
+        dofs_buf = nm.empty((n_cells.max(), n_ep),
+                            dtype=field.econn.dtype)
+        for it, cells in enumerate(cell_parts):
+            n_cell = len(cells)
+            global_dofs = dofs_buf[:n_cell]
+            nm.take(field.econn, cells, axis=0, out=global_dofs, mode='clip')
             if use_expand_dofs:
                 global_dofs = expand_dofs(global_dofs, field.n_components)
-            petsc_dofs_conn = id_map[global_dofs]
-            mpi.send(petsc_dofs_conn.shape[0], it)
-            mpi.send(petsc_dofs_conn.shape[1], it)
-            mpi.Send([petsc_dofs_conn, MPI.INTEGER4], it)
+            nm.take(id_map, global_dofs, mode='clip',
+                    out=uconns_buf[displs[it]:displs[it] + n_cell])
 
-        cells = nm.union1d(gfd.cell_parts[0], gfd.overlap_cells[0])
-        n_cell = len(cells)
+        sheaders = [headers, MPI.INT64_T]
+        scells = [cells_buf, n_cells, displs, MPI.INTEGER4]
+        sconns = [conns_buf, n_cdof * n_cells, n_cdof * displs, MPI.INTEGER4]
 
-        global_dofs = field.econn[cells]
-        if use_expand_dofs:
-            global_dofs = expand_dofs(global_dofs, field.n_components)
+    else:
+        sheaders = scells = sconns = None
+        dof_maps = id_map = None
 
-        dof_map = dof_maps[0]
-        petsc_dofs_range = (gfd.coffsets[0], gfd.coffsets[0] + dof_map[3])
-        petsc_dofs_conn = id_map[global_dofs]
+    # Send subdomain data to all tasks.
+    header = nm.empty(4, dtype=nm.int64)
+    mpi.Scatter(sheaders, [header, MPI.INT64_T], root=0)
 
-    else:
-        # Receive owned cells.
-        n_cell = mpi.recv(source=0)
-        cells = nm.empty(n_cell, dtype=nm.int32)
-        mpi.Recv([cells, MPI.INTEGER4], source=0)
-
-        # Receive owned petsc_dofs range.
-        i0 = mpi.recv(source=0)
-        i1 = mpi.recv(source=0)
-        petsc_dofs_range = (i0, i1)
-
-        # Receive petsc_dofs of global_dofs.
-        n_cell = mpi.recv(source=0)
-        n_cdof = mpi.recv(source=0)
-        petsc_dofs_conn = nm.empty((n_cell, n_cdof), dtype=nm.int32)
-        mpi.Recv([petsc_dofs_conn, MPI.INTEGER4], source=0)
+    n_cell = int(header[0])
+    petsc_dofs_range = (int(header[1]), int(header[2]))
 
-        dof_maps = id_map = None
+    # Overlap the transfers of cells and petsc_dofs_conn.
+    cells = nm.empty(n_cell, dtype=nm.int32)
+    petsc_dofs_conn = nm.empty((n_cell, int(header[3])), dtype=nm.int32)
+    reqs = [mpi.Iscatterv(scells, [cells, MPI.INTEGER4], root=0),
+            mpi.Iscatterv(sconns, [petsc_dofs_conn, MPI.INTEGER4], root=0)]
+    MPI.Request.Waitall(reqs)
 
     if verbose:
         output('field %s:' % field.name)
@@ -527,7 +561,7 @@ def get_local_ordering(field_i, petsc_dofs_conn, use_expand_dofs=False):
     econn = field_i.econn
     if use_expand_dofs:
         econn = expand_dofs(econn, field_i.n_components)
-    petsc_dofs[econn] = petsc_dofs_conn
+    nm.put(petsc_dofs, econn, petsc_dofs_conn)
 
     return petsc_dofs
 
@@ -597,10 +631,9 @@ def expand_dofs(dofs, n_components):
     else:
         sh = None
 
-    edofs = nm.empty(n_components * dofs.shape[0], nm.int32)
-    for idof in range(n_components):
-        aux = n_components * dofs + idof
-        edofs[idof::n_components] = aux
+    edofs = (n_components * dofs[:, None]
+             + nm.arange(n_components, dtype=nm.int32)).ravel()
+    edofs = edofs.astype(nm.int32, copy=False)
 
     if sh is not None:
         edofs.shape = sh[:-1] + (-1,)
@@ -690,6 +723,8 @@ def create_prealloc_data(mtx, pdofs, drange, verbose=False):
     """
     Create CSR preallocation data for a PETSc matrix based on the owned PETSc
     DOFs and a local matrix with EBCs not applied.
+
+    The column indices are sorted in each row, as expected by PETSc.
     """
     owned_dofs = nm.where((pdofs >= drange[0]) & (pdofs < drange[1]))[0]
     owned_dofs = owned_dofs.astype(nm.int32)
@@ -698,7 +733,13 @@ def create_prealloc_data(mtx, pdofs, drange, verbose=False):
 
     ii = nm.argsort(pdofs[owned_dofs])
     aux = mtx[owned_dofs[ii]]
-    mtx_prealloc = Struct(indptr=aux.indptr, indices=pdofs[aux.indices])
+
+    # Sort the PETSc column indices in each row.
+    indices = pdofs[aux.indices]
+    rows = nm.repeat(nm.arange(aux.shape[0]), nm.diff(aux.indptr))
+    indices = indices[nm.lexsort((indices, rows))]
+
+    mtx_prealloc = Struct(indptr=aux.indptr, indices=indices)
 
     return mtx_prealloc
 
@@ -762,16 +803,13 @@ def assemble_rhs_to_petsc(prhs, rhs, pdofs, drange, is_overlap=True,
 
     timer = Timer()
     if is_overlap:
+        # Only the owned values are set, so they can be written directly to
+        # the local part of prhs - no communication is needed.
         output('setting rhs values...', verbose=verbose)
         timer.start()
-        rdofs = nm.where((pdofs < drange[0]) | (pdofs >= drange[1]), -1, pdofs)
-        prhs.setOption(prhs.Option.IGNORE_NEGATIVE_INDICES, True)
-        prhs.setValues(rdofs, rhs, PETSc.InsertMode.INSERT_VALUES)
-        output('...done in', timer.stop(), verbose=verbose)
-
-        output('assembling rhs...', verbose=verbose)
-        timer.start()
-        prhs.assemble()
+        ii = nm.where((pdofs >= drange[0]) & (pdofs < drange[1]))[0]
+        prhs_array = prhs.getArray()
+        prhs_array[pdofs[ii] - drange[0]] = rhs[ii]
         output('...done in', timer.stop(), verbose=verbose)
 
     else:
@@ -785,17 +823,34 @@ def assemble_rhs_to_petsc(prhs, rhs, pdofs, drange, is_overlap=True,
         prhs.assemble()
         output('...done in', timer.stop(), verbose=verbose)
 
+def create_petsc_lgmap(pdofs, comm=None):
+    """
+    Create the local-to-global mapping of PETSc DOFs corresponding to the
+    local ordering `pdofs`.
+    """
+    if comm is None:
+        comm = PETSc.COMM_WORLD
+
+    lgmap = PETSc.LGMap().create(pdofs, comm=comm)
+
+    return lgmap
+
 def assemble_mtx_to_petsc(pmtx, mtx, pdofs, drange, is_overlap=True,
-                          comm=None, verbose=False):
+                          comm=None, lgmap=None, verbose=False):
     """
     Assemble a local CSR matrix to a global PETSc matrix.
+
+    The local-to-global mapping `lgmap` depends only on `pdofs`, so it can be
+    created once by :func:`create_petsc_lgmap()` and passed to repeated calls,
+    e.g. in Newton iterations.
     """
     if comm is None:
         comm = PETSc.COMM_WORLD
 
     timer = Timer()
 
-    lgmap = PETSc.LGMap().create(pdofs, comm=comm)
+    if lgmap is None:
+        lgmap = create_petsc_lgmap(pdofs, comm=comm)
     pmtx.setLGMap(lgmap, lgmap)
     if is_overlap:
         output('setting matrix values...', verbose=verbose)
@@ -818,6 +873,9 @@ def assemble_mtx_to_petsc(pmtx, mtx, pdofs, drange, is_overlap=True,
     else:
         output('setting matrix values...', verbose=verbose)
         timer.start()
+        # The values are added, so clear the previous ones while keeping the
+        # preallocated structure.
+        pmtx.zeroEntries()
         pmtx.setValuesLocalCSR(mtx.indptr, mtx.indices, mtx.data,
                                PETSc.InsertMode.ADD_VALUES)
         output('...done in', timer.stop(), verbose=verbose)
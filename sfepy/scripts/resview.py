@@ -47,25 +47,121 @@ has been run successfully and the resulting data files are present.
 """
 from argparse import ArgumentParser, Action, RawDescriptionHelpFormatter
 from ast import literal_eval
+from collections import OrderedDict
 import numpy as nm
 import os.path as osp
+import re
 
-import pyvista as pv
-from vtk.util.numpy_support import numpy_to_vtk
+# pyvista and VTK are slow to import - they are imported on demand by
+# _import_pyvista().
+pv = None
+numpy_to_vtk = None
 
-cache = {}
+
+class MeshCache(object):
+    """
+    Least recently used cache of the meshes (grids) of time steps and of
+    the related file readers.
+
+    The keys are `(filename, mtime, step, cell_stride)` for the grids,
+    `(filename, mtime, None, cell_stride)` for the lists of grids of all
+    steps of the sfepy .h5 files and `(filename, mtime, None)` for the
+    readers, so that the modified files are read again.
+
+    The data of the next time step can be read in a background thread, see
+    :func:`MeshCache.prefetch()`.
+    """
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self.n_steps = 0
+        self._printed = OrderedDict()
+        self._grids = OrderedDict()
+        self._executor = None
+        self._prefetched = None, None, None
+
+    def prefetch(self, key, make_grid, fun, *args):
+        """
+        Call `fun(*args)` to read the data of the grid of `key` in a
+        background thread. The grid is created by `make_grid(data)` in
+        :func:`MeshCache.finish_prefetch()`, as VTK objects are not thread
+        safe, so `fun()` should do only I/O and NumPy work.
+        """
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+        future = self._executor.submit(fun, *args)
+        self._prefetched = key, make_grid, future
+
+    def finish_prefetch(self):
+        """
+        Wait for the pending prefetch to finish and store its grid.
+        """
+        pkey, make_grid, future = self._prefetched
+        self._prefetched = None, None, None
+        if future is not None:
+            self[pkey] = make_grid(future.result())
+
+    def mark_printed(self, key):
+        """
+        Mark the information on the grid of `key` as printed. Return False if
+        it was already printed.
+        """
+        if key in self._printed:
+            return False
+
+        self._printed[key] = None
+        while len(self._printed) > self.maxsize:
+            self._printed.popitem(last=False)
+
+        return True
+
+    def __contains__(self, key):
+        return key in self._grids
+
+    def __getitem__(self, key):
+        self._grids.move_to_end(key)
+        return self._grids[key]
+
+    def __setitem__(self, key, grid):
+        self._grids[key] = grid
+        self._grids.move_to_end(key)
+        while len(self._grids) > self.maxsize:
+            okey, _ = self._grids.popitem(last=False)
+            self._printed.pop(okey, None)
+
+
+cache = MeshCache()
+
+
+def _set_points(grid, points):
+    """
+    Set new points of `grid` without modifying the points shared with other
+    grids.
+    """
+    grid.SetPoints(pv.vtk_points(points, deep=False))
+
+
+def _get_bounds(bounds):
+    """
+    Return the lower and upper corners and the sizes of the bounding box
+    given by the VTK `bounds` (xmin, xmax, ymin, ymax, zmin, zmax).
+    """
+    aux = nm.asarray(bounds, dtype=nm.float64).reshape((3, 2))
+    return aux[:, 0], aux[:, 1], aux[:, 1] - aux[:, 0]
 
 
 def get_camera_position(bounds, azimuth, elevation, distance=None, zoom=1.):
     phi, psi = nm.deg2rad(azimuth), nm.deg2rad(elevation)
-    bounds = nm.asarray(bounds)
+    lo, hi, size = _get_bounds(bounds)
 
     if distance is not None:
         r = distance / zoom
     else:
-        r = max(bounds[1::2] - bounds[::2]) * 2.0 / zoom
+        r = size.max() * 2.0 / zoom
 
-    center = (bounds[1::2] + bounds[::2]) * 0.5
+    center = (lo + hi) * 0.5
 
     # camera position
     position = (r * nm.cos(phi) * nm.sin(psi),
@@ -80,6 +176,33 @@ def get_camera_position(bounds, azimuth, elevation, distance=None, zoom=1.):
     return [position, tuple(center), view_up]
 
 
+def _mag(vals):
+    """
+    Return the magnitudes of the rows of `vals`.
+    """
+    return nm.sqrt(nm.einsum('ij,ij->i', vals, vals))
+
+
+def _get_range(grid, name, srange=None):
+    """
+    Return the range of values of the array `name` of `grid`. The range
+    `srange = (grid, name, (min, max))` computed together with the array is
+    reused, if given for the same grid and array.
+    """
+    if (srange is not None) and (srange[0] is grid) and (srange[1] == name):
+        return srange[2]
+
+    vals = grid[name]
+    return vals.min(), vals.max()
+
+
+# Only the number literals accepted by literal_eval(), e.g. no leading zeros
+# in integers.
+_int_re = re.compile(r'[-+]?(0|[1-9]\d*)$', re.ASCII)
+_float_re = re.compile(r'[-+]?((\d+\.\d*|\.\d+)([eE][-+]?\d+)?'
+                       r'|\d+[eE][-+]?\d+)$', re.ASCII)
+
+
 def parse_options(opts, separator=':'):
     out = {}
     if opts is None:
@@ -92,6 +215,10 @@ def parse_options(opts, separator=':'):
             val = v[1:]
         elif v[-1] == '%':
             val = ('%', float(v[1:-1]))
+        elif _int_re.match(v, 1):
+            val = int(v[1:])
+        elif _float_re.match(v, 1):
+            val = float(v[1:])
         else:
             try:
                 val = literal_eval(v[1:])
@@ -103,32 +230,98 @@ def parse_options(opts, separator=':'):
     return out
 
 
+def _strip_factors(fields):
+    """
+    Return the (field, options) pairs of `fields` without the scale factor
+    options.
+    """
+    return [(field, ':'.join(opt for opt in (fopts or '').split(':')
+                             if not opt.startswith('f')))
+            for field, fopts in fields]
+
+
+def parse_fields_map(fields_map):
+    """
+    Convert the (cell group, comma-separated fields) pairs to a dict
+    mapping the fields to the cell groups.
+    """
+    return {field.strip(): int(cg)
+            for cg, fields in fields_map for field in fields.split(',')}
+
+
+def _import_pyvista():
+    global pv, numpy_to_vtk
+    if pv is None:
+        import pyvista as pv
+        from vtk.util.numpy_support import numpy_to_vtk
+
+
 def make_cells_from_conn(conns, convert_to_vtk_type):
-    cells, cell_type, offset = [], [], []
-    _offset = 0
+    _import_pyvista()
+    n_cell = sum(conn.shape[0] for conn in conns.values())
+    n_entry = sum(conn.shape[0] * (conn.shape[1] + 1)
+                  for conn in conns.values())
+
+    # Use vtkIdType, so that VTK can use the arrays without conversion.
+    cells = nm.empty(n_entry, dtype=pv.ID_TYPE)
+    # The VTK cell type codes fit into a byte, as in vtkUnsignedCharArray.
+    cell_type = nm.empty(n_cell, dtype=nm.uint8)
+    offset = nm.empty(n_cell, dtype=pv.ID_TYPE)
+
+    ic, ie = 0, 0
     for ctype, conn in conns.items():
         nc, np = conn.shape
+        ne = nc * (np + 1)
 
-        aux = nm.empty((nc, np + 1), dtype=int)
+        aux = cells[ie:ie + ne].reshape((nc, np + 1))
         aux[:, 0] = np
         aux[:, 1:] = conn
-        cells.append(aux.ravel())
 
-        cell_type.append(nm.full(nc, convert_to_vtk_type[ctype]))
-        offset.append(nm.arange(nc) * (np + 1) + _offset)
-        _offset += nc
-
-    cells = nm.concatenate(cells)
-    cell_type = nm.concatenate(cell_type)
-    offset = nm.concatenate(offset)
+        cell_type[ic:ic + nc] = convert_to_vtk_type[ctype]
+        offset[ic:ic + nc] = nm.arange(ie, ie + ne, np + 1)
+        ic += nc
+        ie += ne
 
     return cells, cell_type, offset
 
 
+def _pad_to_3(vals):
+    """
+    Pad the columns of `vals` by zeros to three components.
+    """
+    n, dim = vals.shape
+    out = nm.empty((n, 3), dtype=vals.dtype)
+    out[:, :dim] = vals
+    out[:, dim:] = 0
+    return out
+
+
+def _add_array(data, vals, name):
+    """
+    Add `vals` as the array `name` to the point or cell `data` of a grid.
+
+    The VTK array shares the memory with the (contiguous) numpy array and
+    keeps a reference to it, so no copy is made.
+    """
+    val = numpy_to_vtk(nm.ascontiguousarray(vals), deep=False)
+    val.SetName(name)
+    data.AddArray(val)
+
+
+def _set_array(grid, vals, name):
+    """
+    Set `vals` as the point or cell data array `name` of `grid` according to
+    the length of `vals`, like `grid[name] = vals`, without a copy.
+    """
+    if len(vals) == grid.n_points:
+        _add_array(grid.GetPointData(), vals, name)
+
+    else:
+        _add_array(grid.GetCellData(), vals, name)
+
+
 def add_mat_id_to_grid(grid, cell_groups):
-    val = numpy_to_vtk(cell_groups)
-    val.SetName('mat_id')
-    grid.GetCellData().AddArray(val)
+    _add_array(grid.GetCellData(), cell_groups, 'mat_id')
     return grid
 
 
@@ -136,10 +329,15 @@ vtk_cell_types = {'1_1': 1, '1_2': 3, '2_2': 3, '3_2': 3,
                   '2_3': 5, '2_4': 9, '3_4': 10, '3_8': 12}
 
 def make_grid_from_mesh(mesh, add_mat_id=False):
+    _import_pyvista()
     desc = mesh.descs[0]
-    nv, dim = mesh.coors.shape
 
-    points = nm.c_[mesh.coors, nm.zeros((nv, 3 - dim))]
+    if mesh.dim == 3:
+        points = nm.ascontiguousarray(mesh.coors)
+
+    else:
+        points = _pad_to_3(mesh.coors)
+
     cells, cell_type, offset = make_cells_from_conn(
         {desc: mesh.get_conn(desc)}, vtk_cell_types,
     )
@@ -150,17 +348,76 @@ def make_grid_from_mesh(mesh, add_mat_id=False):
 
     return grid
 
+def _get_xdmf_steps_order(reader):
+    """
+    Return the indices of the time steps stored in an XDMF file sorted by
+    time. Only the XML metadata are used, no data are read.
+    """
+    times = []
+    for istep, grid in enumerate(reader.collection):
+        aux = [float(item.get('Value')) for item in grid if item.tag == 'Time']
+        times.append(aux[0] if len(aux) else istep)
+
+    return nm.argsort(times, kind='stable')
+
+
+def _make_xdmf_step_grid(grid0, data):
+    """
+    Add the `data` of an XDMF file time step, as returned by
+    `TimeSeriesReader.read_data()`, to a shallow copy of `grid0`.
+    """
+    # Share the points and cells, only the data differ.
+    grid = grid0.copy(deep=False)
+    t, pd, cd = data
+    for dk, dv in pd.items():
+        _add_array(grid.GetPointData(), dv, dk)
+
+    for dk, dv in cd.items():
+        aux = dv[0] if len(dv) == 1 else nm.vstack(dv)
+        _add_array(grid.GetCellData(), aux.squeeze(), dk)
+
+    return grid
+
+
+def _cast_fields(grid, dtype):
+    """
+    Cast the floating point data arrays of `grid` to `dtype` in place.
+    """
+    for data, vdata in ((grid.point_data, grid.GetPointData()),
+                        (grid.cell_data, grid.GetCellData())):
+        for name in data.keys():
+            vals = data[name]
+            if (vals.dtype.kind == 'f') and (vals.dtype != dtype):
+                _add_array(vdata, vals.astype(dtype), name)
+
+
+def _stride_cells(grid, stride):
+    """
+    Return the grid with every `stride`-th cell of `grid`.
+    """
+    if stride <= 1:
+        return grid
+
+    grid = grid.extract_cells(nm.arange(0, grid.n_cells, stride))
+    grid.GetPointData().RemoveArray('vtkOriginalPointIds')
+    grid.GetCellData().RemoveArray('vtkOriginalCellIds')
+
+    return grid
+
+
 def read_mesh(filenames, step=None, print_info=True, ret_n_steps=False,
-              use_cache=True):
+              use_cache=True, fields_dtype=None, cell_stride=1):
+    _import_pyvista()
     _, ext = osp.splitext(filenames[0])
+    fstep = 0 if step is None else step
     if ext in ['.vtk', '.vtu']:
-        fstep = 0 if step is None else step
         fname = filenames[fstep]
-        key = (fname, fstep)
+        key = (fname, osp.getmtime(fname), fstep, cell_stride)
         if key not in cache or not use_cache:
-            cache[key] = pv.UnstructuredGrid(fname)
+            cache[key] = _stride_cells(pv.UnstructuredGrid(fname),
+                                       cell_stride)
         mesh = cache[key]
-        cache['n_steps'] = len(filenames)
+        cache.n_steps = len(filenames)
     elif ext in ['.xdmf', '.xdmf3']:
         import meshio
         try:
@@ -170,56 +427,66 @@ def read_mesh(filenames, step=None, print_info=True, ret_n_steps=False,
             from meshio._vtk_common import meshio_to_vtk_type
 
         fname = filenames[0]
-        key = (fname, step)
+        mtime = osp.getmtime(fname)
+        key = (fname, mtime, fstep, cell_stride)
+        # The reader, the grid without data and the time steps order.
+        rkey = (fname, mtime, None)
+        # Always finish a pending prefetch first - the reader is not thread
+        # safe.
+        cache.finish_prefetch()
         if key not in cache:
-            reader = meshio.xdmf.TimeSeriesReader(fname)
-            points, _cells = reader.read_points_cells()
-            points = nm.asarray(points)
-            if points.shape[1] < 3:
-                points = nm.pad(points, [(0, 0), (0, 3 - points.shape[1])])
-            _dcells = {ct.type: ct.data for ct in _cells}
-
-            cells, cell_type, offset = make_cells_from_conn(
-                _dcells, meshio_to_vtk_type,
-            )
-
-            if not reader.num_steps:
-                grid = pv.UnstructuredGrid(offset, cells, cell_type, points)
-                add_mat_id_to_grid(grid, mesh.cmesh.cell_groups)
-                cache[(fname, 0)] = grid
-
-            grids = {}
-            time = []
-            for _step in range(reader.num_steps):
-                grid = pv.UnstructuredGrid(offset, cells, cell_type, points)
-                t, pd, cd = reader.read_data(_step)
-                for dk, dv in pd.items():
-                    val = numpy_to_vtk(dv)
-                    val.SetName(dk)
-                    grid.GetPointData().AddArray(val)
-
-                for dk, dv in cd.items():
-                    val = numpy_to_vtk(nm.vstack(dv).squeeze())
-                    val.SetName(dk)
-                    grid.GetCellData().AddArray(val)
-
-                grids[t] = grid
-                time.append(t)
-
-            time.sort()
-            for _step, t in enumerate(time):
-                cache[(fname, _step)] = grids[t]
-
-            cache[(fname, None)] = cache[(fname, 0)]
-            cache['n_steps'] = reader.num_steps
+            if rkey not in cache:
+                reader = meshio.xdmf.TimeSeriesReader(fname)
+                points, _cells = reader.read_points_cells()
+                points = nm.asarray(points)
+                if points.shape[1] < 3:
+                    points = _pad_to_3(points)
+                _dcells = {ct.type: ct.data for ct in _cells}
 
-        mesh = cache[key]
+                cells, cell_type, offset = make_cells_from_conn(
+                    _dcells, meshio_to_vtk_type,
+                )
+
+                grid0 = pv.UnstructuredGrid(offset, cells, cell_type, points)
+                if not reader.num_steps:
+                    add_mat_id_to_grid(grid0, mesh.cmesh.cell_groups)
+
+                cache[rkey] = (reader, grid0, _get_xdmf_steps_order(reader))
+
+            reader, grid0, order = cache[rkey]
+            if reader.num_steps:
+                mesh = _make_xdmf_step_grid(grid0,
+                                            reader.read_data(order[fstep]))
+
+            else:
+                mesh = grid0
+
+            mesh = _stride_cells(mesh, cell_stride)
+            cache[key] = mesh
+            cache.n_steps = reader.num_steps
+
+        else:
+            mesh = cache[key]
+
+        nkey = (fname, mtime, fstep + 1, cell_stride)
+        if (rkey in cache) and (nkey not in cache):
+            reader, grid0, order = cache[rkey]
+            cache.n_steps = reader.num_steps
+            if fstep + 1 < reader.num_steps:
+                make_grid = lambda data: _stride_cells(
+                    _make_xdmf_step_grid(grid0, data), cell_stride,
+                )
+                cache.prefetch(nkey, make_grid,
+                               reader.read_data, order[fstep + 1])
 
     elif ext in ['.h5', '.h5x']:
         # Custom sfepy format.
         fname = filenames[0]
-        key = (fname, step)
-        if key not in cache:
+        mtime = osp.getmtime(fname)
+        key = (fname, mtime, fstep, cell_stride)
+        # All steps are read at once - keep them in a single entry.
+        fkey = (fname, mtime, None, cell_stride)
+        if fkey not in cache:
             from sfepy.discrete.fem.meshio import MeshIO
 
             io = MeshIO.any_from_filename(fname)
@@ -228,40 +495,37 @@ def read_mesh(filenames, step=None, print_info=True, ret_n_steps=False,
             steps, times, nts = io.read_times()
             if not len(steps):
                 grid0 = make_grid_from_mesh(smesh, add_mat_id=True)
-                cache[(fname, 0)] = grid0
+                grids = [grid0]
 
             else:
                 grid0 = make_grid_from_mesh(smesh, add_mat_id=False)
+                grids = []
 
             for ii, _step in enumerate(steps):
-                grid = grid0.copy()
+                grid = grid0.copy(deep=False)
                 datas = io.read_data(_step)
                 for dk, data in datas.items():
                     vval = data.data
                     if 1 < len(data.dofs) < 3:
-                        vval = nm.c_[vval,
-                                     nm.zeros((len(vval), 3 - len(data.dofs)))]
+                        vval = _pad_to_3(vval)
 
                     if data.mode == 'vertex':
-                        val = numpy_to_vtk(vval)
-                        val.SetName(dk)
-                        grid.GetPointData().AddArray(val)
+                        _add_array(grid.GetPointData(), vval, dk)
 
                     else:
-                        val = numpy_to_vtk(vval[:, 0, :, 0])
-                        val.SetName(dk)
-                        grid.GetCellData().AddArray(val)
+                        _add_array(grid.GetCellData(), vval[:, 0, :, 0], dk)
 
-                cache[(fname, ii)] = grid
+                grids.append(grid)
 
-            cache[(fname, None)] = cache[(fname, 0)]
-            cache['n_steps'] = len(steps)
+            grids = [_stride_cells(grid, cell_stride) for grid in grids]
+            cache[fkey] = (grids, len(steps))
 
-        mesh = cache[key]
+        grids, cache.n_steps = cache[fkey]
+        mesh = grids[fstep]
 
     else:
         fname = filenames[0]
-        key = (fname, step)
+        key = (fname, osp.getmtime(fname), 0, cell_stride)
         if key not in cache:
             from sfepy.discrete.fem.meshio import MeshIO
             from sfepy.discrete.fem import Mesh
@@ -270,13 +534,18 @@ def read_mesh(filenames, step=None, print_info=True, ret_n_steps=False,
             smesh = Mesh(fname)
             smesh = io.read(smesh)
 
-            grid = make_grid_from_mesh(smesh, add_mat_id=True)
-            cache[(fname, 0)] = grid
-            cache['n_steps'] = len(filenames)
+            cache[key] = _stride_cells(make_grid_from_mesh(smesh,
+                                                           add_mat_id=True),
+                                       cell_stride)
+            cache.n_steps = len(filenames)
 
         mesh = cache[key]
 
-    if print_info:
+    if fields_dtype is not None:
+        _cast_fields(mesh, fields_dtype)
+
+    # Print the information only once for each mesh.
+    if print_info and cache.mark_printed(key):
         arrs = {'s': [], 'v': [], 'o': []}
         for aname in mesh.array_names:
             if len(mesh[aname].shape) == 1 or mesh[aname].shape[1] == 1:
@@ -290,34 +559,63 @@ def read_mesh(filenames, step=None, print_info=True, ret_n_steps=False,
         print('mesh from %s%s:' % (fname, step_info))
         print('  points:  %d' % mesh.n_points)
         print('  cells:   %d' % mesh.n_cells)
-        print('  bounds:  %s' % list(zip(nm.min(mesh.points, axis=0),
-                                         nm.max(mesh.points, axis=0))))
+        print('  bounds:  %s' % list(zip(*_get_bounds(mesh.bounds)[:2])))
         if len(arrs['s']) > 0:
             print('  scalars: %s' % ', '.join(arrs['s']))
         if len(arrs['v']) > 0:
             print('  vectors: %s' % ', '.join(arrs['v']))
         if len(arrs['o']) > 0:
             print('  others:  %s' % ', '.join(arrs['o']))
-        print('  steps:   %d' % cache['n_steps'])
+        print('  steps:   %d' % cache.n_steps)
 
     if ret_n_steps:
-        return mesh, cache['n_steps']
+        return mesh, cache.n_steps
     else:
         return mesh
 
 
+def _add_mesh(plotter, key, reuse, mesh, **kwargs):
+    """
+    Add `mesh` to `plotter` and store the mapper of its actor under `key`.
+    If `reuse` is True, only set `mesh` as the input of the stored mapper.
+
+    Returns the mapper.
+    """
+    if reuse:
+        mapper = plotter.resview_mappers[key]
+        scalars = kwargs.get('scalars')
+        if scalars is not None:
+            mesh.set_active_scalars(scalars)
+        mapper.SetInputData(mesh)
+
+    else:
+        plotter.add_mesh(mesh, **kwargs)
+        mapper = plotter.mapper
+        plotter.resview_mappers[key] = mapper
+
+    return mapper
+
+
 def pv_plot(filenames, options, plotter=None, step=None,
             scalar_bar_limits=None, ret_scalar_bar_limits=False,
-            step_inc=None, use_cache=True):
+            step_inc=None, use_cache=True, reuse_actors=False,
+            dry_run=False):
+    """
+    Plot the fields of the given step. If `dry_run` is True, only process the
+    data, and return the scalar bar limits and the bounds of all plots
+    instead of the plotter.
+    """
+    _import_pyvista()
     plots = {}
     color = None
+    # Magnitudes of vector fields of the read steps, shared by the plots.
+    mag_cache = {}
 
-    if plotter is None:
+    if (plotter is None) and not dry_run:
         plotter = pv.Plotter()
 
     fstep = (step if step is not None else options.step)
     if step_inc is not None:
-        plotter.clear()
         fstep += step_inc
     if fstep < 0:
         fstep = 0
@@ -325,11 +623,16 @@ def pv_plot(filenames, options, plotter=None, step=None,
         if fstep >= plotter.resview_n_steps:
             fstep = plotter.resview_n_steps - 1
 
+    # VTK renders in single precision anyway.
+    fields_dtype = (None if getattr(options, 'fp64_fields', False)
+                    else nm.float32)
+    cell_stride = getattr(options, 'stride', 1)
     mesh, n_steps = read_mesh(filenames, fstep, ret_n_steps=True,
-                              use_cache=use_cache)
+                              use_cache=use_cache, fields_dtype=fields_dtype,
+                              cell_stride=cell_stride)
     steps = {fstep: mesh}
 
-    bbox_sizes = nm.diff(nm.reshape(mesh.bounds, (-1, 2)), axis=1)
+    bbox_sizes = _get_bounds(mesh.bounds)[2]
     ii = nm.where(bbox_sizes > 0)[0]
     tdim = len(ii)
     if tdim == 0:
@@ -350,28 +653,27 @@ def pv_plot(filenames, options, plotter=None, step=None,
         options.grid_vector2 = [0, 0, 0]
         options.grid_vector2[ipv2] = 1.6
 
-    plotter.resview_step, plotter.resview_n_steps = fstep, n_steps
+    if plotter is not None:
+        plotter.resview_step, plotter.resview_n_steps = fstep, n_steps
 
-    fields_map = {}
-    if len(options.fields_map) > 0:
-        for cg, fields in options.fields_map:
-            for field in fields.split(','):
-                fields_map[field.strip()] = int(cg)
+    fields_map = getattr(options, 'fields_map_dict', None)
+    if fields_map is None:
+        fields_map = parse_fields_map(options.fields_map)
 
     if len(options.fields) == 0:
         fields = []
         position = 0
+        mesh_size = bbox_sizes.max()
         for field in steps[fstep].array_names:
             if field in ['node_groups', 'mat_id']:
                 continue
 
             fval = steps[fstep][field]
-            bnds = steps[fstep].bounds
-            mesh_size = (nm.array(bnds[1::2]) - nm.array(bnds[::2])).max()
             is_vector_field = len(fval.shape) > 1
             is_point_field = fval.shape[0] == steps[fstep].n_points
             if is_vector_field and is_point_field:
-                scale = mesh_size * 0.15 / nm.linalg.norm(fval, axis=1).max()
+                scale = (mesh_size * 0.15
+                         / nm.sqrt(nm.einsum('ij,ij->i', fval, fval).max()))
                 if not nm.isfinite(scale):
                     scale = 1.0
                 fields.append((field, 'vs:o.4:p%d' % position))
@@ -386,9 +688,24 @@ def pv_plot(filenames, options, plotter=None, step=None,
     else:
         fields = options.fields
 
+    # Reuse the actors of the previous call, only update their input data.
+    # The scale factors, e.g. of the automatic glyphs, change with the step
+    # data but not the actors.
+    fields_key = _strip_factors(fields)
+    reuse = ((reuse_actors or (step_inc is not None))
+             and (getattr(plotter, 'resview_fields', None) == fields_key))
+    if not (reuse or dry_run):
+        if reuse_actors or (step_inc is not None):
+            plotter.clear()
+
+        plotter.resview_fields = fields_key
+        plotter.resview_mappers = {}
+
     plot_id = 0
 
     scalar_bars = {}
+    # The running limits of the scalar bars.
+    bar_limits = {}
     for field, fopts in fields:
         opts = parse_options(fopts)
         plot_info = []
@@ -406,9 +723,13 @@ def pv_plot(filenames, options, plotter=None, step=None,
 
         if fstep not in steps:
             steps[fstep] = read_mesh(filenames, step=fstep,
-                                     use_cache=use_cache)
+                                     use_cache=use_cache,
+                                     fields_dtype=fields_dtype,
+                                     cell_stride=cell_stride)
 
-        pipe = [steps[fstep].copy()]
+        # The shallow copies share the arrays with the cached grids - the
+        # points and data are replaced, never modified in place.
+        pipe = [steps[fstep].copy(deep=False)]
 
         if field in fields_map:  # subregion
             mat_val = fields_map[field]
@@ -436,7 +757,7 @@ def pv_plot(filenames, options, plotter=None, step=None,
         warp = opts.get('w', options.warp)  # warp mesh
         factor = opts.get('f', options.factor)
         if isinstance(factor, tuple):
-            ws = nm.diff(nm.reshape(pipe[-1].bounds, (-1, 2)), axis=1)
+            ws = _get_bounds(pipe[-1].bounds)[2]
             size = ws[ws > 0.0].min()
             fmax = nm.abs(pipe[-1][field]).max()
             factor = 0.01 * float(factor[1]) * size / fmax
@@ -447,12 +768,15 @@ def pv_plot(filenames, options, plotter=None, step=None,
                 field_data.shape = (-1, 1)
             nc = field_data.shape[1]
             if nc == 1:  # Warp by scalar.
-                pipe.append(pipe[-1].copy())
-                pipe[-1].points[:, 2] += field_data[:, 0] * factor
+                points = pipe[-1].points.copy()
+                points[:, 2] += field_data[:, 0] * factor
+                pipe.append(pipe[-1].copy(deep=False))
+                _set_points(pipe[-1], points)
 
             elif nc == 3:
-                pipe.append(pipe[-1].copy())
-                pipe[-1].points += field_data * factor
+                points = pipe[-1].points + field_data * factor
+                pipe.append(pipe[-1].copy(deep=False))
+                _set_points(pipe[-1], points)
 
             else:
                 raise ValueError('warp mesh: scalar or vector field required!')
@@ -460,32 +784,46 @@ def pv_plot(filenames, options, plotter=None, step=None,
             plot_info.append('warp=%s, factor=%.2e' % (warp, factor))
 
         position = opts.get('p', 0)  # determine plotting slot
-        bnds = pipe[-1].bounds
         if 'p' in opts:
-            size = nm.array(bnds[1::2]) - nm.array(bnds[::2])
-            pipe.append(pipe[-1].copy())
+            size = _get_bounds(pipe[-1].bounds)[2]
+            pipe.append(pipe[-1].copy(deep=False))
             pos1 = position % options.max_plots
             pos2 = position // options.max_plots
             shift = pos1 * size * nm.array(options.grid_vector1)
             shift += pos2 * size * nm.array(options.grid_vector2)
-            pipe[-1].translate(shift)
+            _set_points(pipe[-1], pipe[-1].points + shift)
 
-        if opts.get('l', options.outline):  # outline
-            plotter.add_mesh(pipe[-1].outline(), color='k')
+        if opts.get('l', options.outline) and not dry_run:  # outline
+            _add_mesh(plotter, ('outline', plot_id), reuse, pipe[-1].outline(),
+                      color='k')
 
         scalar = field
         scalar_label = scalar
         is_vector_field = field is not None and len(pipe[-1][field].shape) > 1
         is_point_field = (field is not None and
                           pipe[-1][field].shape[0] == pipe[-1].n_points)
+        srange = None
         if is_vector_field:
             field_data = pipe[-1][field]
             scalar = field + '_magnitude'
             scalar_label = f'|{field}|'
-            pipe[-1][scalar] = nm.linalg.norm(field_data, axis=1)
+            # Only the data of the read steps can be shared.
+            is_step_data = (not mat_val) and ('r' not in opts)
+            mkey = (fstep, field)
+            if is_step_data and (mkey in mag_cache):
+                sdata, limits = mag_cache[mkey]
+
+            else:
+                sdata = _mag(field_data)
+                limits = (sdata.min(), sdata.max())
+                if is_step_data:
+                    mag_cache[mkey] = (sdata, limits)
+
+            _set_array(pipe[-1], sdata, scalar)
+            srange = (pipe[-1], scalar, limits)
 
         if 'g' in opts and is_vector_field and is_point_field:  # glyphs
-            pipe[-1][field] *= factor
+            _set_array(pipe[-1], pipe[-1][field] * factor, field)
             pipe[-1].set_active_vectors(field)
             pipe.append(pipe[-1].arrows)
             show_edges = False
@@ -493,7 +831,9 @@ def pv_plot(filenames, options, plotter=None, step=None,
         elif 'c' in opts and is_vector_field:  # select field component
             comp = opts['c']
             scalar = field + '_%d' % comp
-            pipe[-1][scalar] = field_data[:, comp]
+            sdata = field_data[:, comp]
+            _set_array(pipe[-1], sdata, scalar)
+            srange = (pipe[-1], scalar, (sdata.min(), sdata.max()))
         elif 't' in opts:  # streamlines
             npts = opts.get('t')
             if npts is True:
@@ -506,7 +846,7 @@ def pv_plot(filenames, options, plotter=None, step=None,
                 sl_vector = 'gradient'
                 sl_pipe = pipe[-1].compute_derivative(scalars=field)
 
-            cmin, cmax = sl_pipe.bounds[::2], sl_pipe.bounds[1::2]
+            cmin, cmax, csize = _get_bounds(sl_pipe.bounds)
             if tdim == 2:
                 streamlines = sl_pipe.streamlines(vectors=sl_vector,
                                                   pointa=cmin, pointb=cmax,
@@ -514,7 +854,7 @@ def pv_plot(filenames, options, plotter=None, step=None,
                                                   max_time=1e12)
 
             else:
-                radius = 0.5 * nm.linalg.norm(nm.array(cmax) - nm.array(cmin))
+                radius = 0.5 * nm.linalg.norm(csize)
                 streamlines = sl_pipe.streamlines(vectors=sl_vector,
                                                   source_radius=radius,
                                                   n_points=npts,
@@ -525,51 +865,75 @@ def pv_plot(filenames, options, plotter=None, step=None,
         isosurfaces = int(opts.get('i', options.isosurfaces))
         if isosurfaces > 0:  # iso-surfaces
             pipe[-1].set_active_scalars(scalar)
-            field_data = pipe[-1][scalar]
-            pars = (nm.min(field_data), nm.max(field_data), isosurfaces + 1)
-            pipe.append(pipe[-1].contour(nm.linspace(*pars)))
+            fmin, fmax = _get_range(pipe[-1], scalar, srange)
+            pipe.append(pipe[-1].contour(nm.linspace(fmin, fmax,
+                                                     isosurfaces + 1)))
 
-        plotter.add_mesh(pipe[-1], scalars=scalar, color=color,
-                         style=style, show_edges=show_edges,
-                         opacity=opacity,
-                         cmap=options.color_map,
-                         show_scalar_bar=False, label=scalar_label)
+        if dry_run:
+            mapper = None
+
+        else:
+            mapper = _add_mesh(plotter, plot_id, reuse, pipe[-1],
+                               scalars=scalar, color=color,
+                               style=style, show_edges=show_edges,
+                               opacity=opacity,
+                               cmap=options.color_map,
+                               show_scalar_bar=False, label=scalar_label)
+            # A reused mapper keeps the range of the step it was created
+            # for - update it, unless the scalar bar limits are set below.
+            if reuse and scalar and not options.show_scalar_bars:
+                mapper.scalar_range = _get_range(pipe[-1], scalar, srange)
+
+        # The bounds are needed only for the labels and the dry run results,
+        # the camera is set once from the bounds of all steps.
+        if not reuse:
+            lo, hi, _ = _get_bounds(pipe[-1].bounds)
+
+        else:
+            lo = hi = None
 
-        bnds = pipe[-1].bounds
         if position not in plots:
             plots[position] = []
 
         plot_info = ':' + ','.join(plot_info) if len(plot_info) > 0 else ''
         plot_info = '%s(step %d)%s' % (scalar, fstep, plot_info)
-        plots[position].append(((bnds[::2], bnds[1::2]), plot_info))
+        plots[position].append(((lo, hi), plot_info))
 
         if options.show_scalar_bars and scalar:
-            if scalar not in scalar_bars:
+            fmin, fmax = _get_range(pipe[-1], scalar, srange)
+            if scalar_label not in scalar_bars:
                 scalar_bars[scalar_label] = []
+                bar_limits[scalar_label] = (fmin, fmax)
 
-            field_data = pipe[-1][scalar]
-            limits = (nm.min(field_data), nm.max(field_data))
-            scalar_bars[scalar_label].append((limits, plotter.mapper,
-                                              position))
+            else:
+                lmin, lmax = bar_limits[scalar_label]
+                bar_limits[scalar_label] = (min(lmin, fmin), max(lmax, fmax))
+
+            scalar_bars[scalar_label].append((mapper, position))
 
         plot_id += 1
 
+    if dry_run:
+        lo = nm.min([iv[0][0] for v in plots.values() for iv in v], axis=0)
+        hi = nm.max([iv[0][1] for v in plots.values() for iv in v], axis=0)
+        return bar_limits, nm.c_[lo, hi].ravel()
+
     if options.show_scalar_bars:
         if scalar_bar_limits is None:
-            scalar_bar_limits = {}
-            for k, vs in scalar_bars.items():
-                limits = (nm.min([v[0] for v, _, _ in vs]),
-                          nm.max([v[1] for v, _, _ in vs]))
-                scalar_bar_limits[k] = limits
+            scalar_bar_limits = bar_limits
 
         width, height = options.scalar_bar_size
         position_x, position_y, shift_x, shift_y = options.scalar_bar_position
         nslots = len(scalar_bars)
         for k, vs in scalar_bars.items():
             clim = scalar_bar_limits[k]
-            for _, mapper, _ in vs:
+            for mapper, _ in vs:
                 mapper.scalar_range = clim
-            _, mapper, slot = vs[0]
+
+            if reuse:
+                continue
+
+            mapper, slot = vs[0]
 
             slot_x = (nslots - slot - 1) if shift_x < 0 else slot
             x_pos = position_x + slot_x * width * shift_x
@@ -581,7 +945,7 @@ def pv_plot(filenames, options, plotter=None, step=None,
                                    width=width, height=height,
                                    n_labels=2, mapper=mapper)
 
-    if options.show_labels and len(plots) > 1:
+    if options.show_labels and len(plots) > 1 and not reuse:
         labels, points = [], []
         for k, v in plots.items():
             bnds = (nm.min(nm.array([iv[0][0] for iv in v]), axis=0),
@@ -596,6 +960,9 @@ def pv_plot(filenames, options, plotter=None, step=None,
     for k, v in plots.items():
         print('plot %d: %s' % (k, '; '.join(iv[1] for iv in v)))
 
+    if reuse and (step_inc is not None):
+        plotter.render()
+
     if ret_scalar_bar_limits:
         return plotter, scalar_bar_limits
     else:
@@ -608,28 +975,140 @@ def print_camera_position(plotter):
     print(f'--camera-position="{cp}"')
 
 
-def _get_cpos(plotter, options, camera_default=(225, 75, 0.9)):
+def _make_plotter(off_screen=False):
+    """
+    Create a plotter. The off screen plotters do not use anti-aliasing, which
+    is expensive with software rendering on machines without a GPU.
+    """
+    plotter = pv.Plotter(off_screen=off_screen)
+    if off_screen:
+        plotter.disable_anti_aliasing()
+
+    return plotter
+
+
+def _get_cpos(plotter, options, camera_default=(225, 75, 0.9), bounds=None):
     """
-    Uses `plotter.bounds`, so call only after adding all meshes to the plotter.
+    Uses `plotter.bounds` if `bounds` are not given, so call only after adding
+    all meshes to the plotter.
     """
+    if bounds is None:
+        bounds = plotter.bounds
+
     if options.camera_position is not None:
         cpos = nm.array(options.camera_position)
         cpos = cpos.reshape((3, 3))
     elif options.camera:
         zoom = options.camera[2] if len(options.camera) > 2 else 1.
-        cpos = get_camera_position(plotter.bounds,
+        cpos = get_camera_position(bounds,
                                    options.camera[0],
                                    options.camera[1],
                                    zoom=zoom)
     elif options.view_2d:
         cpos = None
     else:
-        cpos = get_camera_position(plotter.bounds, camera_default[0],
+        cpos = get_camera_position(bounds, camera_default[0],
                                    camera_default[1], zoom=camera_default[2])
 
     return cpos
 
 
+def plot_frames(plotter, options, steps, scalar_bar_limits, cpos, bounds,
+                write_frame):
+    """
+    Plot the animation frames of the given steps and call
+    `write_frame(plotter, step)` for each of them. The actors are created in
+    the first frame, the following frames only update their data.
+    """
+    if options.axes_visibility:
+        plotter.add_axes(**dict(options.axes_options))
+
+    for ii, step in enumerate(steps):
+        plotter = pv_plot(options.filenames, options, plotter=plotter,
+                          step=step, scalar_bar_limits=scalar_bar_limits,
+                          reuse_actors=ii > 0)
+        if ii == 0:
+            if cpos is not None:
+                plotter.camera_position = cpos
+
+            elif options.view_2d:
+                plotter.view_xy()
+                plotter.reset_camera(bounds=bounds)
+
+        write_frame(plotter, step)
+
+    return plotter
+
+
+def _get_movie_kwargs(anim_filename):
+    """
+    Return the keyword arguments of the imageio movie writer. The writer
+    already streams the raw frames to a single ffmpeg process, so only let
+    the H.264 encoder trade file size for speed.
+    """
+    if osp.splitext(anim_filename)[1].lower() == '.mp4':
+        return dict(ffmpeg_params=['-preset', 'veryfast'])
+
+    else:
+        return {}
+
+
+def _render_frames(options, steps, scalar_bar_limits, cpos, bounds,
+                   output_dir):
+    """
+    Render the animation frames of the given steps off screen into PNG files
+    in `output_dir` - a worker of :func:`_write_frames_parallel()`.
+    """
+    _import_pyvista()
+    pv.set_plot_theme("document")
+    plotter = _make_plotter(off_screen=True)
+
+    filenames = []
+    def write_frame(plotter, step):
+        filename = osp.join(output_dir, 'frame%06d.png' % step)
+        plotter.screenshot(filename)
+        filenames.append(filename)
+
+    plotter = plot_frames(plotter, options, steps, scalar_bar_limits, cpos,
+                          bounds, write_frame)
+    plotter.close()
+
+    return filenames
+
+
+def _write_frames_parallel(anim_filename, options, n_steps,
+                           scalar_bar_limits, cpos, bounds):
+    """
+    Render the animation frames in `options.parallel_frames` processes, each
+    taking a contiguous block of steps, and write them to the movie file.
+    """
+    from multiprocessing import get_context
+    from tempfile import TemporaryDirectory
+    try:
+        import imageio.v2 as imageio
+
+    except ImportError:
+        import imageio
+
+    n_proc = min(options.parallel_frames, n_steps)
+    blocks = [[int(step) for step in block]
+              for block in nm.array_split(nm.arange(n_steps), n_proc)]
+    with TemporaryDirectory() as output_dir:
+        args = [(options, block, scalar_bar_limits, cpos, bounds, output_dir)
+                for block in blocks]
+        # Do not fork the running XDMF prefetch thread.
+        with get_context('spawn').Pool(n_proc) as pool:
+            filenames = pool.starmap(_render_frames, args)
+
+        writer = imageio.get_writer(anim_filename, fps=options.framerate,
+                                    **_get_movie_kwargs(anim_filename))
+        for block in filenames:
+            for filename in block:
+                writer.append_data(imageio.imread(filename))
+
+        writer.close()
+
+
 class OptsToListAction(Action):
     separator = '='
 
@@ -712,7 +1191,14 @@ helps = {
     'screenshot':
         'save screenshot to file',
     'off_screen':
-        'off screen plots, e.g. when screenshotting',
+        'off screen plots, e.g. when screenshotting; anti-aliasing'
+        ' (MSAA, FXAA) is disabled',
+    'stride':
+        'plot only every n-th cell of the meshes to speed up plotting'
+        ' of large meshes [default: %(default)s]',
+    'fp64_fields':
+        'keep the field data in double precision instead of converting'
+        ' them to single precision',
     'no_labels':
         'hide plot labels',
     'label_position':
@@ -725,6 +1211,13 @@ helps = {
         'select data in a given time step',
     '2d_view':
         '2d view of XY plane',
+    'parallel_frames':
+        'render the animation frames in the given number of processes'
+        ' [default: %(default)s]',
+    'vtk_threads':
+        'set the maximum number of threads used by VTK filters, e.g. 1 to'
+        ' avoid oversubscription when running under MPI [default: VTK'
+        ' default]',
 }
 
 
@@ -803,7 +1296,7 @@ def main():
                         default=None, help=helps['camera_position'])
     parser.add_argument('--window-size', metavar='window_size',
                         action=StoreNumberAction, dest='window_size',
-                        default=pv.global_theme.window_size,
+                        default=None,
                         help=helps['window_size'])
     parser.add_argument('-a', '--animation', metavar='output_file',
                         action='store', dest='anim_output_file',
@@ -817,80 +1310,111 @@ def main():
     parser.add_argument('--off-screen',
                         action='store_true', dest='off_screen',
                         default=False, help=helps['off_screen'])
+    parser.add_argument('--stride', metavar='n',
+                        type=int, dest='stride',
+                        default=1, help=helps['stride'])
+    parser.add_argument('--fp64-fields',
+                        action='store_true', dest='fp64_fields',
+                        default=False, help=helps['fp64_fields'])
     parser.add_argument('-2', '--2d-view',
                         action='store_true', dest='view_2d',
                         default=False, help=helps['2d_view'])
 
+    parser.add_argument('--parallel-frames', metavar='processes',
+                        action=StoreNumberAction, dest='parallel_frames',
+                        default=1, help=helps['parallel_frames'])
+    parser.add_argument('--vtk-threads', metavar='threads',
+                        action=StoreNumberAction, dest='vtk_threads',
+                        default=None, help=helps['vtk_threads'])
+
     parser.add_argument('filenames', nargs='+')
     options = parser.parse_args()
+    if options.stride < 1:
+        parser.error('argument --stride: must be a positive integer')
 
-    pv.set_plot_theme("document")
-    plotter = pv.Plotter(off_screen=options.off_screen)
+    options.fields_map_dict = parse_fields_map(options.fields_map)
+
+    if options.vtk_threads is not None:
+        from vtk import vtkMultiThreader, vtkSMPTools
+
+        vtkSMPTools.Initialize(options.vtk_threads)
+        vtkMultiThreader.SetGlobalMaximumNumberOfThreads(options.vtk_threads)
+        vtkMultiThreader.SetGlobalDefaultNumberOfThreads(options.vtk_threads)
 
+    _import_pyvista()
+    if options.window_size is None:
+        options.window_size = pv.global_theme.window_size
+
+    pv.set_plot_theme("document")
     if options.anim_output_file:
-        _, n_steps = read_mesh(options.filenames, ret_n_steps=True)
-        # dry run
-        scalar_bar_limits = None
-        if options.axes_visibility:
-            plotter.add_axes(**dict(options.axes_options))
+        _, n_steps = read_mesh(options.filenames, ret_n_steps=True,
+                               cell_stride=options.stride)
+        # Keep all steps (and a file reader) cached for both the dry run and
+        # the frames.
+        cache.maxsize = max(cache.maxsize, n_steps + 1)
+
+        # dry run - process the data only to get the scalar bar limits and
+        # the bounds of all steps
+        step_limits = {}
+        bounds = nm.empty((n_steps, 6), dtype=nm.float64)
         for step in range(n_steps):
-            plotter, sb_limits = pv_plot(options.filenames, options,
-                                         plotter=plotter, step=step,
-                                         ret_scalar_bar_limits=True)
-            if scalar_bar_limits is None:
-                scalar_bar_limits = {k: [] for k in sb_limits.keys()}
-
+            sb_limits, bounds[step] = pv_plot(options.filenames, options,
+                                              step=step, dry_run=True)
             for k, v in sb_limits.items():
-                scalar_bar_limits[k].append(v)
+                if k not in step_limits:
+                    step_limits[k] = nm.full((n_steps, 2), nm.nan)
 
-        cpos = _get_cpos(plotter, options)
+                step_limits[k][step] = v
 
-        if cpos is not None:
-            plotter.camera_position = cpos
-
-        elif options.view_2d:
-            plotter.view_xy()
+        scalar_bar_limits = {k: (float(nm.nanmin(v[:, 0])),
+                                 float(nm.nanmax(v[:, 1])))
+                             for k, v in step_limits.items()}
+        bounds = nm.c_[bounds[:, ::2].min(axis=0),
+                       bounds[:, 1::2].max(axis=0)].ravel()
+        cpos = _get_cpos(None, options, bounds=bounds)
 
         anim_filename = options.anim_output_file
-        plotter.open_movie(anim_filename, options.framerate)
+        if (options.parallel_frames > 1) and (n_steps > 1):
+            _write_frames_parallel(anim_filename, options, n_steps,
+                                   scalar_bar_limits, cpos, bounds)
 
-        for k in scalar_bar_limits.keys():
-            lims = scalar_bar_limits[k]
-            clim = (nm.min([v[0] for v in lims]),
-                    nm.max([v[1] for v in lims]))
-            scalar_bar_limits[k] = clim
+        else:
+            # Create the plotter only for the frames, the dry run does not
+            # need it.
+            plotter = _make_plotter(off_screen=options.off_screen)
+            plotter.open_movie(anim_filename, options.framerate,
+                               **_get_movie_kwargs(anim_filename))
+            plot_frames(plotter, options, range(n_steps), scalar_bar_limits,
+                        cpos, bounds, lambda plotter, step:
+                        plotter.write_frame())
 
-        # plot frames
-        for step in range(n_steps):
-            plotter.clear()
-            plotter = pv_plot(options.filenames, options, plotter=plotter,
-                              step=step, scalar_bar_limits=scalar_bar_limits)
-            if options.axes_visibility:
-                plotter.add_axes(**dict(options.axes_options))
+            # All frames are written - show only the on screen plots.
+            if not options.off_screen:
+                plotter.show()
 
-            plotter.write_frame()
+            plotter.close()
 
-        plotter.show()
-        plotter.close()
     else:
+        plotter = _make_plotter(off_screen=options.off_screen)
         plotter = pv_plot(options.filenames, options, plotter=plotter)
         if options.axes_visibility:
             plotter.add_axes(**dict(options.axes_options))
 
-        plotter.add_key_event(
-            'Prior', lambda: pv_plot(options.filenames,
-                                     options,
-                                     step=plotter.resview_step,
-                                     step_inc=-1,
-                                     plotter=plotter)
-        )
-        plotter.add_key_event(
-            'Next', lambda: pv_plot(options.filenames,
-                                    options,
-                                    step=plotter.resview_step,
-                                    step_inc=1,
-                                    plotter=plotter)
-        )
+        n_steps = plotter.resview_n_steps
+        # Keep the read steps cached to step through them without re-reading.
+        cache.maxsize = max(cache.maxsize, n_steps + 1)
+
+        def step_to(delta):
+            step = min(max(plotter.resview_step + delta, 0), n_steps - 1)
+            if step == plotter.resview_step:
+                return
+
+            pv_plot(options.filenames, options, plotter=plotter, step=step,
+                    reuse_actors=True)
+            plotter.render()
+
+        plotter.add_key_event('Prior', lambda: step_to(-1))
+        plotter.add_key_event('Next', lambda: step_to(1))
 
         # Does not work for meshes with no z component.
         plotter.add_key_event(
@@ -901,10 +1425,15 @@ def main():
         if (cpos is None) and options.view_2d:
             plotter.view_xy()
 
-        plotter.show(cpos=cpos, screenshot=options.screenshot,
-                     window_size=options.window_size)
+        # The image is returned only if the screenshot was taken. Depending
+        # on the pyvista version and theme, the camera position can be
+        # returned as well, either alone or in a (cpos, img) tuple.
+        ret = plotter.show(cpos=cpos, screenshot=options.screenshot,
+                           window_size=options.window_size,
+                           return_img=options.screenshot is not None)
+        img = ret[-1] if isinstance(ret, tuple) else ret
 
-        if options.screenshot is not None and osp.exists(options.screenshot):
+        if (options.screenshot is not None) and isinstance(img, nm.ndarray):
             print(f'saved: {options.screenshot}')
 
 if __name__ == '__main__':
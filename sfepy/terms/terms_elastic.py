@@ -118,6 +118,12 @@ class LinearElasticIsotropicTerm(LinearElasticTerm):
                   mode=None, term_mode=None, diff_var=None, **kwargs):
         from sfepy.mechanics.matcoefs import stiffness_from_lame
 
+        if ((lam.shape[0] > 1) and (mu.shape[0] == lam.shape[0])
+            and (lam == lam[:1]).all() and (mu == mu[:1]).all()):
+            # Constant parameters in all cells -> the C functions reuse a
+            # single cell stiffness tensor.
+            lam, mu = lam[:1], mu[:1]
+
         mat = stiffness_from_lame(self.region.dim, lam, mu)[:, :, 0, 0, :, :]
         return LinearElasticTerm.get_fargs(self, mat, virtual, state,
                                            mode=mode, term_mode=term_mode,
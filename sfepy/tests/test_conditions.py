@@ -255,3 +255,55 @@ def test_save_ebc(data, output_dir):
     pb.save_ebc(name + '_ebcs.vtk', ebcs=ebcs, default=-1, force=False)
 
     assert True
+
+def test_apply_ebc_to_matrix():
+    import scipy.sparse as sps
+    from sfepy.discrete.evaluate import apply_ebc_to_matrix
+
+    def make_mtx():
+        # Rows 1, 3 (EBC) and 4 (EPBC master) have zeros stored in their
+        # entries, row 2 is empty.
+        rows = [0, 0, 1, 1, 1, 3, 3, 4, 5, 5]
+        cols = [0, 5, 0, 1, 3, 1, 3, 4, 0, 5]
+        vals = [2, 1, 0, 0, 0, 0, 0, 0, 1, 3]
+        # The explicit zeros are kept in the sparsity pattern.
+        mtx = sps.csr_matrix((nm.array(vals, dtype=nm.float64),
+                              (rows, cols)), shape=(6, 6))
+        return mtx
+
+    def make_expected(ebc_rows, epbc_rows=None):
+        expected = make_mtx().toarray()
+        for ir in ebc_rows:
+            if ir != 2:
+                expected[ir, ir] = 1.0
+
+        if epbc_rows is not None:
+            for im, i_s in zip(*epbc_rows):
+                expected[im, im] = 1.0
+                expected[im, i_s] = -1.0
+
+        return expected
+
+    ok = True
+    cases = [
+        ('EBC rows', nm.array([1, 3]), None),
+        ('EBC rows with an empty row', nm.array([1, 2, 3]), None),
+        ('no EBC rows', nm.array([], dtype=nm.int32), None),
+        ('EBC list', [3, 1, 2], None),
+        ('EPBC rows', nm.array([1]), (nm.array([4]), nm.array([5]))),
+        ('EPBC lists', [], ([4, 2], [0, 5])),
+    ]
+    for name, ebc_rows, epbc_rows in cases:
+        mtx = make_mtx()
+        nnz = mtx.nnz
+        apply_ebc_to_matrix(mtx, ebc_rows, epbc_rows=epbc_rows)
+
+        _ok = nm.array_equal(mtx.toarray(),
+                             make_expected(ebc_rows, epbc_rows))
+        if epbc_rows is None:
+            _ok = _ok and (mtx.nnz == nnz)
+
+        tst.report('%s: %s' % (name, _ok))
+        ok = ok and _ok
+
+    assert ok
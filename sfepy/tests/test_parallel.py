@@ -0,0 +1,195 @@
+import numpy as nm
+import pytest
+
+import sfepy.base.testing as tst
+
+pytest.importorskip('petsc4py')
+pytest.importorskip('mpi4py')
+
+@pytest.fixture(scope='module')
+def domain():
+    from sfepy.mesh.mesh_generators import gen_block_mesh
+    from sfepy.discrete.fem import FEDomain
+
+    mesh = gen_block_mesh([2, 2], [5, 5], [0, 0], name='block', verbose=False)
+    domain = FEDomain('domain', mesh)
+    domain.create_region('Omega', 'all')
+    return domain
+
+def get_cell_tasks(domain):
+    """
+    2x2 partition of the 4x4 cells by quadrants.
+    """
+    centres = domain.cmesh.get_centroids(2)
+    cell_tasks = ((centres[:, 0] > 0).astype(nm.int32)
+                  + 2 * (centres[:, 1] > 0))
+    return cell_tasks
+
+def get_ref_dof_maps(field, cell_tasks, inter_facets, use_expand_dofs):
+    """
+    Get the owned DOFs and the overlap cells of tasks using the FESurface
+    connectivity of the interface facets.
+    """
+    from sfepy.base.base import ordered_iteritems
+    from sfepy.discrete.common.region import Region
+    from sfepy.discrete.fem.fe_surface import FESurface
+    from sfepy.parallel.parallel import expand_dofs
+
+    def _expand(dofs):
+        if use_expand_dofs:
+            dofs = expand_dofs(dofs, field.n_components)
+        return dofs
+
+    domain = field.domain
+    cmesh = domain.cmesh
+
+    n_dof = field.n_nod * (field.n_components if use_expand_dofs else 1)
+    claimed = nm.zeros(n_dof, dtype=bool)
+    owned = {}
+    overlaps = {}
+    ok = True
+    for ir, ntasks in ordered_iteritems(inter_facets):
+        cells = nm.where(cell_tasks == ir)[0].astype(nm.int32)
+        cregion = Region.from_cells(cells, domain, name='ref_task_%d' % ir)
+        domain.regions.append(cregion)
+        dofs = _expand(field.get_dofs_in_region(cregion))
+
+        inter_dofs = []
+        for ic, facets in ordered_iteritems(ntasks):
+            region = Region.from_facets(facets, domain,
+                                        'ref_inter_%d_%d' % (ir, ic),
+                                        parent=cregion.name)
+            region.update_shape()
+            inter_dofs.append(_expand(field.get_dofs_in_region(region)))
+
+            sd = FESurface('surface_data_%s' % region.name, region,
+                           field.efaces, field.econn, field.region)
+            econn = sd.get_connectivity()
+            ii2 = max(econn.shape[0] // 2, 1)
+            for it, conn, hfacets in ((ir, econn[:ii2], region.facets[:ii2]),
+                                      (ic, econn[ii2:], region.facets[ii2:])):
+                hdofs = _expand(nm.unique(conn))
+                new_dofs = hdofs[~claimed[hdofs]]
+                if len(new_dofs):
+                    claimed[new_dofs] = True
+                    owned.setdefault(it, []).append(new_dofs)
+                    ovs = cmesh.get_incident(0, hfacets, cmesh.tdim - 1)
+                    ocs = cmesh.get_incident(cmesh.tdim, ovs, 0)
+                    overlaps.setdefault(it, []).append(ocs)
+
+        domain.regions.pop()
+
+        # The inner DOFs are not claimed by any interface.
+        inner_dofs = nm.setdiff1d(dofs, nm.concatenate(inter_dofs))
+        ok = ok and not claimed[inner_dofs].any()
+        claimed[inner_dofs] = True
+        owned.setdefault(ir, []).append(inner_dofs)
+
+    owned = {key : nm.sort(nm.concatenate(val))
+             for key, val in owned.items()}
+    overlaps = {key : nm.unique(nm.concatenate(val))
+                for key, val in overlaps.items()}
+
+    return owned, overlaps, ok
+
+def test_get_inter_facets(domain):
+    from sfepy.parallel.parallel import get_inter_facets
+
+    cmesh = domain.cmesh
+
+    cell_tasks = get_cell_tasks(domain)
+    inter_facets = get_inter_facets(domain, cell_tasks)
+
+    fcentres = cmesh.get_centroids(1)
+    # Task couple: (interface coordinate axis, facet centres along it).
+    expected = {
+        (0, 1) : (0, [-0.75, -0.25]),
+        (2, 3) : (0, [0.25, 0.75]),
+        (0, 2) : (1, [-0.75, -0.25]),
+        (1, 3) : (1, [0.25, 0.75]),
+    }
+
+    ok = sorted(inter_facets.keys()) == [0, 1, 2, 3]
+    tst.report('tasks: %s' % ok)
+
+    for (i0, i1), (axis, coors) in expected.items():
+        facets = inter_facets[i0][i1]
+        _ok = nm.all(facets == inter_facets[i1][i0])
+        _ok = _ok and nm.all(nm.diff(facets) > 0)
+        _ok = _ok and nm.allclose(fcentres[facets, axis], 0.0,
+                                  rtol=0.0, atol=1e-14)
+        _ok = _ok and nm.allclose(nm.sort(fcentres[facets, 1 - axis]),
+                                  coors, rtol=0.0, atol=1e-14)
+        tst.report('tasks %d, %d: %s' % (i0, i1, _ok))
+        ok = ok and _ok
+
+    # The diagonal tasks share only a vertex.
+    _ok = ((3 not in inter_facets[0]) and (2 not in inter_facets[1])
+           and all(len(v) == 2 for v in inter_facets.values()))
+    tst.report('no diagonal neighbours: %s' % _ok)
+    ok = ok and _ok
+
+    assert ok
+
+def test_expand_dofs():
+    from sfepy.parallel.parallel import expand_dofs
+
+    dofs = nm.array([0, 2, 5], dtype=nm.int32)
+    edofs = expand_dofs(dofs, 3)
+    ok = ((edofs.dtype == nm.int32)
+          and nm.all(edofs == [0, 1, 2, 6, 7, 8, 15, 16, 17]))
+    tst.report('1D: %s' % ok)
+
+    dofs = nm.array([[0, 2], [1, 3], [4, 0]], dtype=nm.uint32)
+    edofs = expand_dofs(dofs, 2)
+    _ok = ((edofs.dtype == nm.int32)
+           and nm.all(edofs == [[0, 1, 4, 5],
+                                [2, 3, 6, 7],
+                                [8, 9, 0, 1]]))
+    tst.report('2D: %s' % _ok)
+    ok = ok and _ok
+
+    assert ok
+
+@pytest.mark.parametrize('approx_order', [1, 2])
+@pytest.mark.parametrize('use_expand_dofs', [False, True])
+def test_create_task_dof_maps(domain, approx_order, use_expand_dofs):
+    from sfepy.discrete.fem import Field
+    from sfepy.parallel.parallel import (get_inter_facets,
+                                         create_task_dof_maps,
+                                         verify_task_dof_maps)
+
+    field = Field.from_args('fu', nm.float64, 2, domain.regions['Omega'],
+                            approx_order=approx_order)
+
+    cell_tasks = get_cell_tasks(domain)
+    inter_facets = get_inter_facets(domain, cell_tasks)
+
+    n_region = len(domain.regions)
+    dof_maps, id_map, cell_parts, overlap_cells = create_task_dof_maps(
+        field, cell_tasks, inter_facets, use_expand_dofs=use_expand_dofs,
+    )
+    ok = len(domain.regions) == n_region
+    tst.report('regions removed: %s' % ok)
+
+    verify_task_dof_maps(dof_maps, id_map, field,
+                         use_expand_dofs=use_expand_dofs)
+
+    owned, overlaps, _ok = get_ref_dof_maps(field, cell_tasks, inter_facets,
+                                            use_expand_dofs)
+    tst.report('inner DOFs not on interfaces: %s' % _ok)
+    ok = ok and _ok
+
+    for ir, dof_map in dof_maps.items():
+        dofs = nm.sort(nm.concatenate([dof_map[0]] + dof_map[1]))
+        _ok = ((dof_map[3] == len(dofs))
+               and nm.array_equal(dofs, owned[ir]))
+        tst.report('task %d owned DOFs: %s' % (ir, _ok))
+        ok = ok and _ok
+
+        _ok = nm.array_equal(overlap_cells[ir],
+                             overlaps.get(ir, nm.zeros(0, dtype=nm.int32)))
+        tst.report('task %d overlap cells: %s' % (ir, _ok))
+        ok = ok and _ok
+
+    assert ok